@@ -0,0 +1,119 @@
+# checkpoint.py
+
+import os
+import pickle
+import queue
+import threading
+
+from mfa_advanced import MarketModel, load_real_data
+
+
+def write_checkpoint(state, file_path):
+    """Grava um estado de forma atômica: arquivo temporário + fsync + os.replace."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def save_checkpoint(model, file_path):
+    """Salva o estado completo do MarketModel (de forma síncrona)."""
+    write_checkpoint(model.get_state(), file_path)
+
+
+def load_checkpoint(file_path, real_prices_series, perf=None):
+    """Recria o MarketModel salvo em `file_path`. A série real deve ser a mesma da simulação original."""
+    with open(file_path, "rb") as f:
+        state = pickle.load(f)
+    return MarketModel.from_state(state, real_prices_series, perf=perf)
+
+
+class AsyncCheckpointWriter:
+    """
+    Grava checkpoints numa thread de fundo.
+
+    O snapshot (`model.get_state()`) é tirado no thread da simulação, que segue
+    rodando enquanto a serialização e a escrita em disco acontecem em paralelo.
+    Se um checkpoint ainda estiver sendo gravado, o próximo espera por ele.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._pending = queue.Queue(maxsize=1)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, model):
+        if self._error is not None:
+            raise RuntimeError("Falha ao gravar checkpoint") from self._error
+        self._pending.put(model.get_state())
+
+    def _write_loop(self):
+        while True:
+            state = self._pending.get()
+            if state is None:
+                break
+            try:
+                write_checkpoint(state, self.file_path)
+            except Exception as e:
+                self._error = e
+
+    def close(self):
+        """Espera o último checkpoint ser gravado."""
+        if self._thread.is_alive():
+            self._pending.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError("Falha ao gravar checkpoint") from self._error
+
+
+def run_simulation(model, n_steps, checkpoint_path, checkpoint_every=10000, verbose=True):
+    """
+    Roda o modelo até `model.steps == n_steps`, gravando checkpoints periódicos.
+
+    `n_steps` é o total da simulação, então a mesma chamada serve tanto para
+    começar quanto para continuar um modelo recuperado de um checkpoint.
+    """
+    writer = AsyncCheckpointWriter(checkpoint_path)
+    try:
+        while model.steps < n_steps:
+            model.step()
+            if model.steps % checkpoint_every == 0:
+                writer.submit(model)
+                if verbose:
+                    print(f"Checkpoint no passo {model.steps}/{n_steps}. Preço atual: ${model.current_price:.2f}")
+        writer.submit(model)
+    finally:
+        writer.close()
+    return model
+
+
+def resume_simulation(checkpoint_path, real_prices_series, n_steps, checkpoint_every=10000, verbose=True):
+    """Continua, a partir do último checkpoint, uma simulação iniciada com run_simulation."""
+    model = load_checkpoint(checkpoint_path, real_prices_series)
+    if verbose:
+        print(f"Retomando do passo {model.steps} (checkpoint '{checkpoint_path}')")
+    return run_simulation(model, n_steps, checkpoint_path, checkpoint_every, verbose)
+
+
+# --- Bloco de Execução ---
+if __name__ == '__main__':
+    real_prices_data = load_real_data(os.path.join('data', 'ETH_USDT_1m.parquet'))
+
+    if real_prices_data is not None:
+        N_STEPS = 200_000
+        CHECKPOINT_EVERY = 10_000
+        CHECKPOINT_PATH = os.path.join('data', 'checkpoints', 'mfa_simulation.pkl')
+
+        if os.path.exists(CHECKPOINT_PATH):
+            model = resume_simulation(CHECKPOINT_PATH, real_prices_data, N_STEPS, CHECKPOINT_EVERY)
+        else:
+            print("Iniciando uma nova simulação longa com checkpoints...")
+            model = MarketModel(40, 40, 15, 5, real_prices_data, seed=42)
+            run_simulation(model, N_STEPS, CHECKPOINT_PATH, CHECKPOINT_EVERY)
+
+        print(f"Simulação finalizada com {len(model.price_history):,} preços.")
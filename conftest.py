@@ -0,0 +1,14 @@
+# conftest.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def synthetic_prices():
+    """Gera séries de preços sintéticas (passeio aleatório geométrico) para testes sem dados reais."""
+    def make(n=3000, seed=0):
+        rng = np.random.default_rng(seed)
+        return pd.Series(2000 * np.exp(np.cumsum(rng.normal(0, 0.001, n))), name='close')
+    return make
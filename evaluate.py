@@ -0,0 +1,136 @@
+# evaluate.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from trading_env import TradingEnv, load_real_data
+
+INITIAL_BALANCE = 10000  # Patrimônio inicial do TradingEnv
+
+
+def _run_lockstep(policy, real_prices, n_episodes, n_envs, seeds, deterministic, env_kwargs):
+    """
+    Roda `n_episodes` episódios em `n_envs` ambientes avançando juntos.
+
+    A cada tick, as observações dos ambientes ativos são empilhadas num único
+    array e a política é chamada uma só vez (`policy.predict` em lote).
+    """
+    n_envs = min(n_envs, n_episodes)
+    envs = [TradingEnv(real_prices_data=real_prices, **env_kwargs) for _ in range(n_envs)]
+    observations = np.zeros((n_envs,) + envs[0].observation_space.shape, dtype=np.float32)
+
+    results = []
+    next_episode = 0
+    episode_ids = [None] * n_envs
+    peaks = np.zeros(n_envs)
+    max_drawdowns = np.zeros(n_envs)
+    active = np.zeros(n_envs, dtype=bool)
+
+    def start_episode(i):
+        nonlocal next_episode
+        observations[i], info = envs[i].reset(seed=seeds[next_episode])
+        episode_ids[i] = next_episode
+        peaks[i] = info["net_worth"]
+        max_drawdowns[i] = 0.0
+        active[i] = True
+        next_episode += 1
+
+    for i in range(n_envs):
+        start_episode(i)
+
+    while active.any():
+        indices = np.flatnonzero(active)
+        actions, _ = policy.predict(observations[indices], deterministic=deterministic)
+
+        for i, action in zip(indices, np.asarray(actions).reshape(len(indices), -1)[:, 0]):
+            observations[i], reward, terminated, truncated, info = envs[i].step(int(action))
+
+            net_worth = info["net_worth"]
+            peaks[i] = max(peaks[i], net_worth)
+            if peaks[i] > 0:
+                max_drawdowns[i] = max(max_drawdowns[i], (peaks[i] - net_worth) / peaks[i])
+
+            if terminated or truncated:
+                results.append({
+                    "episode": episode_ids[i],
+                    "seed": seeds[episode_ids[i]],
+                    "steps": envs[i].current_step,
+                    "final_net_worth": net_worth,
+                    "profit": net_worth - INITIAL_BALANCE,
+                    "max_drawdown": max_drawdowns[i],
+                    "total_reward": info["total_reward"],
+                })
+                active[i] = False
+                if next_episode < n_episodes:
+                    start_episode(i)
+
+    return results
+
+
+def _evaluate_worker(policy_loader, real_prices, n_episodes, n_envs, seeds, first_episode, deterministic,
+                     env_kwargs):
+    results = _run_lockstep(policy_loader(), real_prices, n_episodes, n_envs, seeds, deterministic, env_kwargs)
+    for result in results:
+        result["episode"] += first_episode
+    return results
+
+
+def evaluate_policy_batched(policy, real_prices, n_episodes=32, n_envs=8, n_workers=1, seed=None,
+                            deterministic=True, env_kwargs=None):
+    """
+    Avalia uma política (ex.: modelo do stable-baselines3) em muitos episódios do TradingEnv.
+
+    :param policy: Objeto com `predict(obs_batch, deterministic=...)`. Com n_workers > 1, passe
+                   uma função sem argumentos (picklable) que carrega a política em cada processo,
+                   ex.: functools.partial(PPO.load, 'modelo.zip')
+    :param real_prices: Série de preços reais para o TradingEnv
+    :param n_episodes: Total de episódios avaliados
+    :param n_envs: Ambientes avançando em lote por processo (um `predict` por tick para todos)
+    :param n_workers: Processos usados; os episódios são divididos entre eles
+    :param seed: Semente base; cada episódio recebe uma semente derivada
+    :param deterministic: Repassado ao `predict`
+    :param env_kwargs: Argumentos extras do TradingEnv (ex.: window_size)
+    :return: DataFrame com uma linha por episódio (patrimônio final, lucro, drawdown máximo, ...)
+    """
+    env_kwargs = env_kwargs or {}
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n_episodes)]
+
+    if n_workers == 1:
+        # Aceita a política pronta ou, como com n_workers > 1, uma função/classe que a cria
+        if isinstance(policy, type) or not hasattr(policy, "predict"):
+            policy = policy()
+        results = _run_lockstep(policy, real_prices, n_episodes, n_envs, seeds, deterministic, env_kwargs)
+    else:
+        # Divide os episódios em blocos contíguos, um por processo
+        bounds = np.linspace(0, n_episodes, n_workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [
+                pool.submit(_evaluate_worker, policy, real_prices, end - start, n_envs, seeds[start:end],
+                            start, deterministic, env_kwargs)
+                for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+            ]
+            results = [result for future in futures for result in future.result()]
+
+    return pd.DataFrame(results).sort_values("episode").reset_index(drop=True)
+
+
+# --- Bloco de Execução ---
+if __name__ == '__main__':
+    import functools
+    import sys
+
+    from stable_baselines3 import PPO
+
+    real_data = load_real_data(os.path.join('data', 'ETH_USDT_1m.parquet'))
+    model_path = sys.argv[1] if len(sys.argv) > 1 else 'ppo_trading.zip'
+
+    if real_data is not None:
+        print(f"Avaliando '{model_path}'...")
+        metrics = evaluate_policy_batched(
+            functools.partial(PPO.load, model_path), real_data,
+            n_episodes=64, n_envs=8, n_workers=os.cpu_count() or 1, seed=42,
+        )
+        print(metrics.describe()[["final_net_worth", "profit", "max_drawdown"]])
@@ -7,18 +7,54 @@ import matplotlib.pyplot as plt
 import os
 
 # --- Carregando os Dados Reais (sem alterações) ---
-def load_real_data(file_path):
+def load_real_data(file_path, dtype=None):
+    """Carrega a série de fechamento. Com dtype=np.float32 a série ocupa metade da memória."""
     if not os.path.exists(file_path):
         print(f"Erro: Arquivo de dados '{file_path}' não encontrado.")
         return None
-    df = pd.read_parquet(file_path)
+    df = pd.read_parquet(file_path, columns=['close'])
+    if dtype is not None:
+        return df['close'].astype(dtype)
     return df['close']
 
 # --- Definições dos Agentes (com MarketMaker e lógica probabilística) ---
 
+class AgentParam:
+    """
+    Parâmetro de agente guardado em struct-of-arrays no modelo.
+
+    O valor fica em `model.agent_params[<classe>][<nome>][agent.param_index]`,
+    então milhares de agentes com parâmetros sorteados não custam um objeto
+    Python por parâmetro. Parâmetros com `grouped=True` definem os grupos de
+    sinais do modelo; alterá-los reconstrói os grupos. A chave de classe é a
+    da classe que declara o parâmetro, então subclasses usam os mesmos arrays.
+    """
+    def __init__(self, grouped=False):
+        self.grouped = grouped
+
+    def __set_name__(self, owner, name):
+        self.owner_key = owner.__name__
+        self.name = name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        # .item() devolve um escalar Python, como os atributos comuns de antes
+        return agent.model.agent_params[self.owner_key][self.name][agent.param_index].item()
+
+    def __set__(self, agent, value):
+        agent.model.agent_params[self.owner_key][self.name][agent.param_index] = value
+        if self.grouped:
+            agent.model._build_param_groups()
+
 class MarketAgent(Agent):
-    def __init__(self, model):
+    # Parâmetros de cada tipo de agente e seus valores padrão (dtype segue o tipo do padrão)
+    param_defaults = {}
+
+    def __init__(self, model, param_index):
+        # param_index é obrigatório: os parâmetros vivem nos arrays do modelo, não no agente
         super().__init__(model)
+        self.param_index = param_index # Posição do agente nos arrays de parâmetros da sua classe
         self.demand = 0
 
     def step(self):
@@ -26,56 +62,42 @@ class MarketAgent(Agent):
 
 class ChartistAgent(MarketAgent):
     """Grafista com decisão probabilística."""
-    def __init__(self, model, lookback_period=10, conviction=0.75):
-        super().__init__(model)
-        self.lookback_period = lookback_period
-        self.conviction = conviction # Confiança base do agente
+    param_defaults = {'lookback_period': 10, 'conviction': 0.75}
+    lookback_period = AgentParam(grouped=True)
+    conviction = AgentParam() # Confiança base do agente
 
     def step(self):
-        history = self.model.price_history
-        if len(history) < self.lookback_period:
+        # Tendência calculada uma vez por tick para cada lookback distinto (ver MarketModel._compute_signals):
+        # 1 = alta, -1 = baixa, 0 = histórico menor que o lookback
+        trend = self.model.chartist_signals[self.param_index]
+        if trend == 0:
             self.demand = 0
             return
         
-        recent_prices = history[-self.lookback_period:]
         # Ação é baseada na tendência, mas a decisão é probabilística
-        if recent_prices[-1] > recent_prices[0]: # Tendência de alta
-            if self.model.random.random() < self.conviction:
-                self.demand = 1
-            else:
-                self.demand = 0
-        else: # Tendência de baixa
-            if self.model.random.random() < self.conviction:
-                self.demand = -1
-            else:
-                self.demand = 0
+        if self.model.random.random() < self.conviction:
+            self.demand = trend
+        else:
+            self.demand = 0
 
 class FundamentalistAgent(MarketAgent):
     """Fundamentalista com decisão probabilística."""
-    def __init__(self, model, fundamental_period=200, conviction=0.75):
-        super().__init__(model)
-        self.fundamental_period = fundamental_period
-        self.conviction = conviction
+    param_defaults = {'fundamental_period': 200, 'conviction': 0.75}
+    fundamental_period = AgentParam(grouped=True)
+    conviction = AgentParam()
 
     def step(self):
-        real_data_index = self.model.step_count
-        if real_data_index < self.fundamental_period or real_data_index >= len(self.model.real_prices):
+        # Valor fundamental calculado uma vez por tick para cada período distinto:
+        # 1 = preço "barato", -1 = preço "caro", 0 = sem dados reais suficientes
+        signal = self.model.fundamentalist_signals[self.param_index]
+        if signal == 0:
             self.demand = 0
             return
-            
-        fundamental_value = self.model.real_prices.iloc[real_data_index - self.fundamental_period : real_data_index].mean()
-        current_price = self.model.current_price
 
-        if current_price < fundamental_value: # Preço "barato"
-            if self.model.random.random() < self.conviction:
-                self.demand = 1
-            else:
-                self.demand = 0
-        else: # Preço "caro"
-            if self.model.random.random() < self.conviction:
-                self.demand = -1
-            else:
-                self.demand = 0
+        if self.model.random.random() < self.conviction:
+            self.demand = signal
+        else:
+            self.demand = 0
 
 class NoiseTraderAgent(MarketAgent):
     """Trader de Ruído (sem alterações)."""
@@ -87,9 +109,8 @@ class MarketMakerAgent(MarketAgent):
     NOVO AGENTE: O Estabilizador.
     Age contra a demanda líquida para prover liquidez e reduzir a volatilidade.
     """
-    def __init__(self, model, strength=0.5):
-        super().__init__(model)
-        self.strength = strength # Quão forte ele age contra o mercado
+    param_defaults = {'strength': 0.5}
+    strength = AgentParam() # Quão forte ele age contra o mercado
 
     def step(self):
         # Este agente age DEPOIS dos outros, então sua lógica vai no 'advance' do modelo
@@ -99,43 +120,178 @@ class MarketMakerAgent(MarketAgent):
         # Age na direção oposta à demanda líquida, com uma certa força
         self.demand = -net_demand * self.strength
 
+def sample_agent_params(agent_cls, n, distributions, rng):
+    """
+    Gera os arrays de parâmetros de `n` agentes de `agent_cls`.
+
+    Cada entrada de `distributions` pode ser um valor fixo, uma sequência com
+    `n` valores, ou uma função `(rng, n) -> array` (ex.: `lambda rng, n: rng.integers(5, 60, n)`).
+    Parâmetros ausentes usam `agent_cls.param_defaults`.
+    """
+    unknown = set(distributions) - set(agent_cls.param_defaults)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos para {agent_cls.__name__}: {sorted(unknown)}")
+
+    params = {}
+    for name, default in agent_cls.param_defaults.items():
+        dtype = np.int64 if isinstance(default, int) else np.float64
+        spec = distributions.get(name, default)
+        if callable(spec):
+            values = np.asarray(spec(rng, n), dtype=dtype)
+        elif np.ndim(spec) == 0:
+            values = np.full(n, spec, dtype=dtype)
+        else:
+            values = np.asarray(spec, dtype=dtype)
+        if values.shape != (n,):
+            raise ValueError(f"{agent_cls.__name__}.{name}: esperado shape ({n},), recebido {values.shape}")
+        params[name] = values
+    return params
+
 # --- Modelo de Mercado Avançado ---
 
+# Ordem em que o MarketModel cria os agentes (e em que o checkpoint os recria)
+AGENT_CLASSES = (ChartistAgent, FundamentalistAgent, NoiseTraderAgent, MarketMakerAgent)
+STATE_VERSION = 3
+
+# Capacidade inicial do buffer do histórico de preços (cresce dobrando)
+HISTORY_CHUNK = 4096
+
+# Guarda numérica da atualização de preço: o expoente de np.exp(demanda * impacto) é
+# calculado em float64 (também no modo float32) e limitado a ±0.5 (variação máxima de
+# ~65% por passo). Assim exp() nunca estoura e o novo preço sempre cabe no alcance do
+# float32 (~3.4e38); na prática o limite nunca é atingido (|demanda| <= 50 e o impacto
+# é ~1e-5), então o modo float64 produz exatamente os mesmos caminhos de antes.
+MAX_LOG_PRICE_CHANGE = 0.5
+
 class MarketModel(Model):
-    def __init__(self, n_chartists, n_fundamentalists, n_noise, n_makers, real_prices_series):
-        super().__init__()
+    def __init__(self, n_chartists, n_fundamentalists, n_noise, n_makers, real_prices_series, perf=None,
+                 seed=None, start_offset=0, dtype=np.float64, agent_params=None):
+        # seed alimenta tanto self.random (agentes) quanto self.rng (ruído de preço)
+        super().__init__(seed=seed)
+        # dtype dos preços reais e do histórico. Use load_real_data(..., dtype=np.float32)
+        # para evitar uma cópia da série a cada modelo criado.
+        self.dtype = np.dtype(dtype)
+        if real_prices_series.dtype != self.dtype:
+            real_prices_series = real_prices_series.astype(self.dtype)
         self.real_prices = real_prices_series
+        # Instrumentação opcional (perf_stats.PerfStats); None = desligada
+        self.perf = perf
         self.step_count = 0
         
+        # start_offset escolhe em que ponto dos dados reais a simulação começa
         self.initial_history_size = 200
-        self.price_history = self.real_prices.iloc[:self.initial_history_size].tolist()
-        self.current_price = self.price_history[-1]
-        self.step_count = self.initial_history_size
+        if start_offset < 0 or start_offset + self.initial_history_size > len(self.real_prices):
+            raise ValueError(f"start_offset inválido: {start_offset}")
+        self.start_offset = start_offset
+        self._set_price_history(self.real_prices.iloc[start_offset:start_offset + self.initial_history_size].to_numpy())
+        self.current_price = float(self.price_history[-1])
+        self.step_count = start_offset + self.initial_history_size
         
         # Fator de impacto muito menor para evitar overflow
-        real_volatility = self.real_prices.pct_change().std()
+        # Calculado sempre em float64 (no modo float32, só os preços ficam em float32)
+        real_prices_64 = self.real_prices if self.dtype == np.float64 else self.real_prices.astype(np.float64)
+        real_volatility = float(real_prices_64.pct_change().std())
         self.base_impact = real_volatility * 0.01  # Reduzido drasticamente
         self.impact_factor = self.base_impact
+        # Soma acumulada (float64) dos preços reais: a média de qualquer janela sai em O(1)
+        self._real_prices_cumsum = np.concatenate(([0.0], np.cumsum(real_prices_64.to_numpy())))
+
+        # Parâmetros dos agentes em struct-of-arrays: {classe: {parâmetro: array}}.
+        # agent_params aceita distribuições por classe, ex.:
+        #   {'ChartistAgent': {'lookback_period': lambda rng, n: rng.integers(5, 60, n)}}
+        # Só distribuições dadas como função consomem self.rng.
+        agent_params = agent_params or {}
+        counts = {ChartistAgent: n_chartists, FundamentalistAgent: n_fundamentalists,
+                  NoiseTraderAgent: n_noise, MarketMakerAgent: n_makers}
+        unknown = set(agent_params) - {cls.__name__ for cls in AGENT_CLASSES}
+        if unknown:
+            raise ValueError(f"Classes de agente desconhecidas em agent_params: {sorted(unknown)}")
+        self.agent_params = {
+            cls.__name__: sample_agent_params(cls, counts[cls], agent_params.get(cls.__name__, {}), self.rng)
+            for cls in AGENT_CLASSES
+        }
+        self._build_param_groups()
 
         # Criar os agentes usando a nova API
         self.market_makers = []
         
         for i in range(n_chartists):
-            agent = ChartistAgent(self)
+            agent = ChartistAgent(self, i)
             
         for i in range(n_fundamentalists):
-            agent = FundamentalistAgent(self)
+            agent = FundamentalistAgent(self, i)
             
         for i in range(n_noise):
-            agent = NoiseTraderAgent(self)
+            agent = NoiseTraderAgent(self, i)
             
         for i in range(n_makers):
-            maker = MarketMakerAgent(self)
+            maker = MarketMakerAgent(self, i)
             self.market_makers.append(maker) # Market makers agem separadamente
 
+    def _build_param_groups(self):
+        """Agrupa os agentes por lookback/período idêntico para calcular cada sinal uma vez por tick."""
+        self._lookbacks, self._lookback_groups = np.unique(
+            self.agent_params['ChartistAgent']['lookback_period'], return_inverse=True)
+        self._periods, self._period_groups = np.unique(
+            self.agent_params['FundamentalistAgent']['fundamental_period'], return_inverse=True)
+
+    def _compute_signals(self):
+        """
+        Sinais compartilhados do tick, um cálculo por valor distinto de parâmetro:
+        tendência sobre cada lookback k e valor fundamental sobre cada período p.
+        O resultado é expandido para uma lista por agente (indexada por param_index).
+        """
+        history = self.price_history
+        n_history = len(history)
+        last_price = history[-1]
+        trends = np.array([
+            0 if k > n_history else (1 if last_price > history[-k] else -1) for k in self._lookbacks.tolist()
+        ], dtype=np.int64)
+        self.chartist_signals = trends[self._lookback_groups].tolist()
+
+        index = self.step_count
+        cumsum = self._real_prices_cumsum
+        signals = []
+        for p in self._periods.tolist():
+            if index < p or index >= len(self.real_prices):
+                signals.append(0)
+                continue
+            # Média de real_prices[index - p : index]
+            fundamental_value = (cumsum[index] - cumsum[index - p]) / p
+            signals.append(1 if self.current_price < fundamental_value else -1)
+        self.fundamentalist_signals = np.array(signals, dtype=np.int64)[self._period_groups].tolist()
+
+    @property
+    def price_history(self):
+        """Histórico de preços: view (no dtype do modelo) do buffer interno pré-alocado."""
+        return self._history[:self._history_len]
+
+    def _set_price_history(self, prices):
+        prices = np.asarray(prices, dtype=self.dtype)
+        self._history = np.empty(max(HISTORY_CHUNK, 2 * len(prices)), dtype=self.dtype)
+        self._history[:len(prices)] = prices
+        self._history_len = len(prices)
+
+    def _append_price(self, price):
+        if self._history_len == len(self._history):
+            grown = np.empty(2 * len(self._history), dtype=self.dtype)
+            grown[:self._history_len] = self._history
+            self._history = grown
+        self._history[self._history_len] = price
+        self._history_len += 1
+
     def step(self):
-        # 1. Ativa os traders normais usando a nova API
+        perf = self.perf
+        if perf is not None:
+            t = perf.clock()
+
+        # 1. Sinais compartilhados (por lookback/período distinto) e ativação dos traders
+        self._compute_signals()
+        if perf is not None:
+            t = perf.lap("model.signals", t)
         self.agents.shuffle_do("step")
+        if perf is not None:
+            t = perf.lap("model.shuffle_do", t)
         
         # 2. Calcula a demanda líquida dos traders
         trader_demand = sum(agent.demand for agent in self.agents)
@@ -147,22 +303,27 @@ class MarketModel(Model):
 
         # 4. Calcula a demanda final e atualiza o preço
         total_demand = trader_demand + maker_demand
+        if perf is not None:
+            t = perf.lap("model.demand_sum", t)
         
         # 5. Ajuste dinâmico do impacto com validações
         if len(self.price_history) > 20:
-            recent_prices = pd.Series(self.price_history[-20:])
+            recent_prices = pd.Series(self.price_history[-20:], dtype=np.float64)
             recent_vol = recent_prices.pct_change().std()
             # Validação para evitar divisão por zero ou valores inválidos
             if pd.notna(recent_vol) and recent_vol > 0:
                 self.impact_factor = self.base_impact / (1 + recent_vol * 100)  # Reduzido o multiplicador
             else:
                 self.impact_factor = self.base_impact
+        if perf is not None:
+            t = perf.lap("model.volatility", t)
 
         # Limitar a demanda total para evitar overflow
         total_demand = np.clip(total_demand, -50, 50)
         
-        # Aplicar mudança de preço com validações
-        price_change_factor = np.exp(total_demand * self.impact_factor)
+        # Aplicar mudança de preço com validações (ver MAX_LOG_PRICE_CHANGE)
+        log_change = np.clip(total_demand * self.impact_factor, -MAX_LOG_PRICE_CHANGE, MAX_LOG_PRICE_CHANGE)
+        price_change_factor = np.exp(log_change)
         
         # Validar se o fator é válido
         if np.isfinite(price_change_factor) and price_change_factor > 0:
@@ -170,15 +331,91 @@ class MarketModel(Model):
         
         # Adicionar ruído apenas se o preço for válido
         if np.isfinite(self.current_price) and self.current_price > 0:
-            noise_factor = 1 + np.random.normal(0, 0.0005)
+            noise_factor = 1 + self.rng.normal(0, 0.0005)
             self.current_price *= noise_factor
         
-        # Validação final do preço
-        if not np.isfinite(self.current_price) or self.current_price <= 0:
-            self.current_price = self.price_history[-1]  # Usar o último preço válido
+        # Validação final do preço, já no dtype do histórico
+        stored_price = self.dtype.type(self.current_price)
+        if not np.isfinite(stored_price) or stored_price <= 0:
+            stored_price = self.price_history[-1]  # Usar o último preço válido
 
-        self.price_history.append(self.current_price)
+        self._append_price(stored_price)
+        self.current_price = float(stored_price)
         self.step_count += 1
+        if perf is not None:
+            perf.lap("model.price_update", t)
+            perf.incr("model.steps")
+            perf.incr("model.agent_calls", len(self.agents) + len(self.market_makers))
+
+    # --- Snapshot do estado (checkpoints) ---
+
+    def get_state(self):
+        """
+        Retorna uma cópia compacta de todo o estado mutável do modelo.
+
+        A série de preços reais não é incluída (só seu tamanho e primeiro valor,
+        para validação); ela deve ser passada de novo em `from_state`.
+        """
+        agents = list(self.agents)  # Ordem de criação
+        counts = {cls.__name__: sum(type(agent) is cls for agent in agents) for cls in AGENT_CLASSES}
+        agent_params = {
+            cls_name: {name: values.copy() for name, values in params.items()}
+            for cls_name, params in self.agent_params.items()
+        }
+        return {
+            'version': STATE_VERSION,
+            'counts': counts,
+            'agent_params': agent_params,
+            'demands': np.array([agent.demand for agent in agents], dtype=np.float64),
+            'dtype': self.dtype.str,
+            'price_history': self.price_history.copy(),
+            'current_price': float(self.current_price),
+            'step_count': self.step_count,
+            'steps': self.steps,
+            'start_offset': self.start_offset,
+            'base_impact': self.base_impact,
+            'impact_factor': self.impact_factor,
+            'random_state': self.random.getstate(),
+            'rng_state': self.rng.bit_generator.state,
+            'real_prices_len': len(self.real_prices),
+            'real_prices_first': float(self.real_prices.iloc[0]),
+        }
+
+    @classmethod
+    def from_state(cls, state, real_prices_series, perf=None):
+        """Reconstrói um modelo a partir de `get_state`; a continuação é bit a bit idêntica."""
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Versão de estado não suportada: {state.get('version')}")
+        if (len(real_prices_series) != state['real_prices_len']
+                or float(real_prices_series.iloc[0]) != state['real_prices_first']):
+            raise ValueError("A série de preços reais não corresponde à usada no checkpoint.")
+
+        counts = state['counts']
+        model = cls(
+            counts['ChartistAgent'], counts['FundamentalistAgent'], counts['NoiseTraderAgent'],
+            counts['MarketMakerAgent'], real_prices_series, perf=perf, start_offset=state['start_offset'],
+            dtype=state['dtype']
+        )
+
+        model.agent_params = {
+            cls_name: {name: values.copy() for name, values in params.items()}
+            for cls_name, params in state['agent_params'].items()
+        }
+        model._build_param_groups()
+
+        agents = list(model.agents)
+        for agent, demand in zip(agents, state['demands'].tolist()):
+            agent.demand = demand
+
+        model._set_price_history(state['price_history'])
+        model.current_price = state['current_price']
+        model.step_count = state['step_count']
+        model.steps = state['steps']
+        model.base_impact = state['base_impact']
+        model.impact_factor = state['impact_factor']
+        model.random.setstate(state['random_state'])
+        model.rng.bit_generator.state = state['rng_state']
+        return model
 
 # --- Bloco de Execução ---
 if __name__ == '__main__':
@@ -0,0 +1,185 @@
+# monte_carlo.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from mfa_advanced import MarketModel, load_real_data
+
+DEFAULT_MODEL_KWARGS = {"n_chartists": 40, "n_fundamentalists": 40, "n_noise": 15, "n_makers": 5}
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+# Série de preços reais de cada processo worker (enviada uma única vez pelo initializer)
+_worker_real_prices = None
+
+
+def _init_worker(real_prices):
+    global _worker_real_prices
+    _worker_real_prices = real_prices
+
+
+def _open_store(store, n_paths, n_steps):
+    """Abre o destino dos caminhos: ('shm', nome) ou ('file', caminho). Retorna (array, handle)."""
+    kind, location = store
+    if kind == "shm":
+        shm = shared_memory.SharedMemory(name=location)
+        return np.ndarray((n_paths, n_steps), dtype=np.float32, buffer=shm.buf), shm
+    return np.memmap(location, dtype=np.float32, mode="r+", shape=(n_paths, n_steps)), None
+
+
+def _simulate_chunk(first_path, seeds, offsets, n_steps, n_paths, store, model_kwargs):
+    """Simula um bloco de caminhos e escreve cada um direto no array compartilhado."""
+    paths, shm = _open_store(store, n_paths, n_steps)
+    try:
+        for i, (seed, offset) in enumerate(zip(seeds, offsets)):
+            model = MarketModel(real_prices_series=_worker_real_prices, seed=seed, start_offset=offset,
+                                **model_kwargs)
+            for _ in range(n_steps):
+                model.step()
+            paths[first_path + i] = model.price_history[model.initial_history_size:]
+        if shm is None:
+            paths.flush()
+    finally:
+        del paths
+        if shm is not None:
+            shm.close()
+    # Só o tamanho do bloco volta pelo IPC; os preços já estão no array compartilhado
+    return len(seeds)
+
+
+class EnsembleResult:
+    """Resultado de run_ensemble: bandas de quantis por passo e, opcionalmente, os caminhos em disco."""
+    def __init__(self, quantile_levels, quantiles, mean, seeds, start_offsets, store_path=None):
+        self.quantile_levels = quantile_levels
+        self.quantiles = quantiles          # shape (len(quantile_levels), n_steps)
+        self.mean = mean                    # shape (n_steps,)
+        self.seeds = seeds
+        self.start_offsets = start_offsets
+        self.store_path = store_path
+
+    def load_paths(self, mode="r"):
+        """Abre os caminhos salvos em disco (np.memmap, shape (n_paths, n_steps))."""
+        if self.store_path is None:
+            raise ValueError("Os caminhos não foram salvos; use store_path em run_ensemble.")
+        return np.memmap(self.store_path, dtype=np.float32, mode=mode,
+                         shape=(len(self.seeds), self.mean.shape[0]))
+
+
+def _summarize(paths, quantile_levels, block_size=256):
+    """Calcula quantis e média por passo em blocos de colunas para limitar a memória."""
+    n_steps = paths.shape[1]
+    quantiles = np.empty((len(quantile_levels), n_steps), dtype=np.float32)
+    mean = np.empty(n_steps, dtype=np.float32)
+    for start in range(0, n_steps, block_size):
+        block = np.asarray(paths[:, start:start + block_size], dtype=np.float64)
+        quantiles[:, start:start + block_size] = np.quantile(block, quantile_levels, axis=0)
+        mean[start:start + block_size] = block.mean(axis=0)
+    return quantiles, mean
+
+
+def run_ensemble(real_prices, n_paths, n_steps=1000, seed=None, start_offsets=None, n_workers=None,
+                 chunk_size=32, store_path=None, quantile_levels=DEFAULT_QUANTILES, model_kwargs=None,
+                 verbose=True):
+    """
+    Gera `n_paths` caminhos sintéticos do MarketModel em paralelo.
+
+    :param real_prices: Série de preços reais usada para calibrar cada modelo
+    :param n_paths: Número de caminhos a simular
+    :param n_steps: Passos por caminho
+    :param seed: Semente base; cada caminho recebe uma semente derivada (SeedSequence.spawn)
+    :param start_offsets: None (0), um int para todos os caminhos, ou uma sequência com um offset por caminho
+    :param n_workers: Processos do pool (padrão: os.cpu_count()); 1 roda no processo atual
+    :param chunk_size: Caminhos por tarefa enviada ao pool
+    :param store_path: Se informado, os caminhos (float32) ficam salvos nesse arquivo (np.memmap);
+                       caso contrário usam memória compartilhada e são descartados após o resumo
+    :param quantile_levels: Quantis das bandas retornadas
+    :param model_kwargs: Contagem de agentes do MarketModel (padrão: 40/40/15/5)
+    :param verbose: Imprime o progresso
+    :return: EnsembleResult
+    """
+    model_kwargs = dict(DEFAULT_MODEL_KWARGS if model_kwargs is None else model_kwargs)
+    n_workers = n_workers or os.cpu_count() or 1
+
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n_paths)]
+    if start_offsets is None:
+        start_offsets = 0
+    if np.isscalar(start_offsets):
+        start_offsets = [int(start_offsets)] * n_paths
+    start_offsets = [int(o) for o in start_offsets]
+    if len(start_offsets) != n_paths:
+        raise ValueError(f"start_offsets deve ter {n_paths} elementos, recebeu {len(start_offsets)}.")
+
+    # --- Destino compartilhado dos caminhos ---
+    shm = None
+    if store_path is not None:
+        paths = np.memmap(store_path, dtype=np.float32, mode="w+", shape=(n_paths, n_steps))
+        store = ("file", store_path)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, n_paths * n_steps * 4))
+        paths = np.ndarray((n_paths, n_steps), dtype=np.float32, buffer=shm.buf)
+        store = ("shm", shm.name)
+
+    tasks = [
+        (start, seeds[start:start + chunk_size], start_offsets[start:start + chunk_size],
+         n_steps, n_paths, store, model_kwargs)
+        for start in range(0, n_paths, chunk_size)
+    ]
+
+    try:
+        done = 0
+        if n_workers == 1:
+            _init_worker(real_prices)
+            for task in tasks:
+                done += _simulate_chunk(*task)
+                if verbose:
+                    print(f"Caminhos concluídos: {done}/{n_paths}")
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(real_prices,)) as pool:
+                futures = [pool.submit(_simulate_chunk, *task) for task in tasks]
+                for future in as_completed(futures):
+                    done += future.result()
+                    if verbose:
+                        print(f"Caminhos concluídos: {done}/{n_paths}")
+
+        quantiles, mean = _summarize(paths, quantile_levels)
+    finally:
+        if shm is not None:
+            del paths
+            shm.close()
+            shm.unlink()
+        else:
+            paths.flush()
+            del paths
+
+    return EnsembleResult(tuple(quantile_levels), quantiles, mean, seeds, start_offsets, store_path)
+
+
+# --- Bloco de Execução ---
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    real_prices_data = load_real_data(os.path.join('data', 'ETH_USDT_1m.parquet'))
+
+    if real_prices_data is not None:
+        N_PATHS = 1000
+        N_STEPS = 1000
+
+        print(f"Gerando {N_PATHS} caminhos sintéticos de {N_STEPS} passos...")
+        result = run_ensemble(real_prices_data, N_PATHS, n_steps=N_STEPS, seed=42)
+
+        plt.figure(figsize=(15, 7))
+        levels = result.quantile_levels
+        n_bands = len(levels) // 2
+        for i in range(n_bands):
+            plt.fill_between(range(N_STEPS), result.quantiles[i], result.quantiles[-1 - i], alpha=0.2,
+                             color='tab:blue', label=f'Quantis {levels[i]:.0%}–{levels[-1 - i]:.0%}')
+        plt.plot(result.mean, color='tab:blue', label='Média')
+        plt.title(f"Ensemble Monte Carlo do MFA ({N_PATHS} caminhos)")
+        plt.xlabel("Passos de Tempo")
+        plt.ylabel("Preço")
+        plt.legend()
+        plt.grid(True)
+        plt.show()
@@ -0,0 +1,122 @@
+# perf_stats.py
+
+import json
+import time
+
+# Número de buckets do histograma: bucket i guarda durações com bit_length == i (em ns)
+N_BUCKETS = 64
+
+
+class PhaseHistogram:
+    """Histograma logarítmico (base 2) de durações em nanossegundos."""
+    def __init__(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        self.buckets[min(duration_ns.bit_length(), N_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def quantile_ns(self, q):
+        """Quantil aproximado por interpolação linear dentro do bucket [2^(i-1), 2^i)."""
+        if self.count == 0:
+            return 0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= target:
+                low = (1 << (i - 1)) if i > 0 else 0
+                high = 1 << i
+                value = low + (high - low) * (target - seen) / n
+                return min(max(value, self.min_ns), self.max_ns)
+            seen += n
+        return self.max_ns
+
+    def summary(self):
+        mean_ns = self.total_ns / self.count if self.count else 0
+        return {
+            "count": self.count,
+            "total_ms": self.total_ns / 1e6,
+            "mean_us": mean_ns / 1e3,
+            "min_us": (self.min_ns or 0) / 1e3,
+            "max_us": self.max_ns / 1e3,
+            "p50_us": self.quantile_ns(0.50) / 1e3,
+            "p90_us": self.quantile_ns(0.90) / 1e3,
+            "p99_us": self.quantile_ns(0.99) / 1e3,
+        }
+
+
+class PerfStats:
+    """
+    Instrumentação opcional por fase para o MarketModel e o TradingEnv.
+
+    Os chamadores guardam `perf = None` quando a instrumentação está desligada
+    e só chamam `clock()`/`lap()` se `perf is not None`, então o custo
+    desligado é apenas uma comparação por fase.
+    """
+    def __init__(self, trace=False, max_trace_events=1_000_000):
+        self.histograms = {}
+        self.counters = {}
+        self.trace = trace
+        self.max_trace_events = max_trace_events
+        self.trace_events = []  # tuplas (nome, início_ns, duração_ns)
+        self._origin_ns = time.perf_counter_ns()
+
+    @staticmethod
+    def clock():
+        return time.perf_counter_ns()
+
+    def lap(self, phase, start_ns):
+        """Registra a duração da fase desde `start_ns` e retorna o instante atual."""
+        now = time.perf_counter_ns()
+        hist = self.histograms.get(phase)
+        if hist is None:
+            hist = self.histograms[phase] = PhaseHistogram()
+        hist.record(now - start_ns)
+        if self.trace and len(self.trace_events) < self.max_trace_events:
+            self.trace_events.append((phase, start_ns, now - start_ns))
+        return now
+
+    def incr(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+        self.trace_events.clear()
+        self._origin_ns = time.perf_counter_ns()
+
+    def summary(self):
+        """Retorna um dicionário serializável com contadores e tempos por fase."""
+        return {
+            "counters": dict(self.counters),
+            "phases": {name: hist.summary() for name, hist in self.histograms.items()},
+        }
+
+    def dump_json(self, file_path):
+        with open(file_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_chrome_trace(self, file_path):
+        """Salva os eventos no formato Chrome Trace (abrir em chrome://tracing ou Perfetto)."""
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start_ns - self._origin_ns) / 1e3,
+                "dur": duration_ns / 1e3,
+                "pid": 0,
+                "tid": 0,
+            }
+            for name, start_ns, duration_ns in self.trace_events
+        ]
+        with open(file_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
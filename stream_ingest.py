@@ -0,0 +1,277 @@
+# stream_ingest.py
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+TIMEFRAME_MS = 60_000  # velas de 1 minuto (padrão quando a fonte não informa o intervalo)
+
+
+# --- Fontes de Velas ---
+
+class CcxtCandleFeed:
+    """Fonte de velas fechadas via polling na API da exchange (ccxt)."""
+    def __init__(self, symbol='ETH/USDT', timeframe='1m', exchange_id='binance'):
+        import ccxt  # Só é necessário para a fonte real
+
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange = getattr(ccxt, exchange_id)({'enableRateLimit': True})
+        self.interval_ms = self.exchange.parse_timeframe(timeframe) * 1000  # Duração de cada vela
+
+    def fetch_closed(self, since_ms):
+        """Retorna as velas [timestamp, open, high, low, close, volume] já fechadas com timestamp >= since_ms."""
+        ohlcv = self.exchange.fetch_ohlcv(self.symbol, self.timeframe, since_ms, 1000)
+        now_ms = self.exchange.milliseconds()
+        # A última vela retornada normalmente ainda está aberta
+        return [candle for candle in ohlcv if candle[0] >= since_ms and candle[0] + self.interval_ms <= now_ms]
+
+
+class FakeCandleFeed:
+    """
+    Fonte local para testes: uma thread emite uma vela "fechada" a cada
+    `interval_s` segundos reais (cada vela representa 1 minuto simulado).
+    """
+    interval_ms = TIMEFRAME_MS
+
+    def __init__(self, start_price=2000.0, interval_s=1.0, start_ms=None, seed=None):
+        self.interval_s = interval_s
+        self._rng = np.random.default_rng(seed)
+        self._price = start_price
+        self._next_ms = start_ms if start_ms is not None else (int(time.time() * 1000) // TIMEFRAME_MS) * TIMEFRAME_MS
+        self._candles = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._emit_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _emit_loop(self):
+        while not self._stop.wait(self.interval_s):
+            open_price = self._price
+            close_price = open_price * float(np.exp(self._rng.normal(0, 0.001)))
+            high = max(open_price, close_price) * (1 + abs(float(self._rng.normal(0, 0.0003))))
+            low = min(open_price, close_price) * (1 - abs(float(self._rng.normal(0, 0.0003))))
+            volume = float(self._rng.gamma(2.0, 50.0))
+            with self._lock:
+                self._candles.append([self._next_ms, open_price, high, low, close_price, volume])
+            self._price = close_price
+            self._next_ms += TIMEFRAME_MS
+
+    def fetch_closed(self, since_ms):
+        with self._lock:
+            return [candle for candle in self._candles if candle[0] >= since_ms]
+
+
+# --- Armazenamento em Disco ---
+
+def _candles_to_frame(candles):
+    """Converte velas em um DataFrame no mesmo formato do download_data.py."""
+    df = pd.DataFrame(candles, columns=CANDLE_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.set_index('timestamp')
+
+
+def load_dataset(tail_dir, base_file=None):
+    """
+    Carrega o dataset completo: o arquivo base (opcional, do download_data.py)
+    seguido das partes gravadas pelo CandleIngestor em `tail_dir`.
+    """
+    frames = []
+    if base_file is not None and os.path.exists(base_file):
+        frames.append(pd.read_parquet(base_file))
+    if os.path.isdir(tail_dir):
+        for name in sorted(os.listdir(tail_dir)):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                frames.append(pd.read_parquet(os.path.join(tail_dir, name)))
+    if not frames:
+        return None
+    df = pd.concat(frames)
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def last_stored_timestamp_ms(tail_dir, base_file=None):
+    """Timestamp (ms) da última vela em disco, lendo apenas o arquivo mais recente."""
+    parts = sorted(
+        name for name in os.listdir(tail_dir) if name.startswith('part-') and name.endswith('.parquet')
+    ) if os.path.isdir(tail_dir) else []
+    if parts:
+        last_file = os.path.join(tail_dir, parts[-1])
+    elif base_file is not None and os.path.exists(base_file):
+        last_file = base_file
+    else:
+        return None
+    index = pd.read_parquet(last_file, columns=['close']).index
+    return int(index.max().value // 1_000_000)
+
+
+# --- Serviço de Ingestão ---
+
+class CandleIngestor:
+    """
+    Serviço de longa duração que mantém o dataset local atualizado.
+
+    Faz polling da fonte por velas fechadas novas, grava-as em `tail_dir` em
+    pequenos lotes Parquet (um arquivo por lote, escrita atômica) e publica
+    cada vela numa fila limitada para consumidores como o QueueReplayMarket.
+    Se a fila estiver cheia, a vela mais antiga é descartada (contada em
+    `dropped`), de modo que um consumidor lento nunca trava a ingestão nem
+    faz a memória crescer.
+    """
+    def __init__(self, feed, tail_dir, base_file=None, since_ms=None, batch_size=60,
+                 flush_interval_s=60.0, poll_interval_s=5.0, queue_size=1000):
+        self.feed = feed
+        self.tail_dir = tail_dir
+        self.interval_ms = getattr(feed, 'interval_ms', TIMEFRAME_MS)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.poll_interval_s = poll_interval_s
+        self.candles = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.written = 0
+        os.makedirs(tail_dir, exist_ok=True)
+
+        # Continua de onde o dataset em disco parou; sem nada em disco, começa pela
+        # vela atual (é um serviço de "tail", não um download do histórico inteiro)
+        if since_ms is None:
+            last_ms = last_stored_timestamp_ms(tail_dir, base_file)
+            if last_ms is not None:
+                since_ms = last_ms + self.interval_ms
+            else:
+                since_ms = (int(time.time() * 1000) // self.interval_ms) * self.interval_ms
+        self.next_ms = since_ms
+
+        self._batch = []
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Para o polling e grava o lote pendente."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Erro na ingestão de velas: {e}. Tentando novamente em {self.poll_interval_s}s...")
+            self._stop.wait(self.poll_interval_s)
+
+    def poll_once(self):
+        """Busca velas novas, publica-as na fila e grava o lote se necessário."""
+        new_candles = [c for c in self.feed.fetch_closed(self.next_ms) if c[0] >= self.next_ms]
+        new_candles.sort(key=lambda candle: candle[0])
+        for candle in new_candles:
+            if candle[0] < self.next_ms:
+                continue  # Duplicata dentro do mesmo lote
+            self.next_ms = candle[0] + self.interval_ms
+            self._batch.append(candle)
+            self._publish(candle)
+
+        if len(self._batch) >= self.batch_size or (
+                self._batch and time.monotonic() - self._last_flush >= self.flush_interval_s):
+            self.flush()
+        return len(new_candles)
+
+    def _publish(self, candle):
+        while True:
+            try:
+                self.candles.put_nowait(candle)
+                return
+            except queue.Full:
+                try:
+                    self.candles.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def flush(self):
+        """
+        Grava o lote atual como um novo arquivo Parquet.
+
+        O lote só é descartado depois que o arquivo foi renomeado para o nome
+        final; se a escrita falhar, as velas continuam pendentes e entram no
+        próximo flush (o `next_ms` já passou delas, então não seriam buscadas de novo).
+        """
+        if not self._batch:
+            self._last_flush = time.monotonic()
+            return
+        batch = self._batch
+        # O timestamp da primeira vela no nome mantém as partes em ordem cronológica
+        file_path = os.path.join(self.tail_dir, f"part-{batch[0][0]:015d}.parquet")
+        tmp_path = file_path + ".tmp"
+        _candles_to_frame(batch).to_parquet(tmp_path)
+        os.replace(tmp_path, file_path)
+        self._batch = []
+        self.written += len(batch)
+        self._last_flush = time.monotonic()
+
+
+# --- Replay para o TradingEnv ---
+
+class QueueReplayMarket:
+    """
+    Substituto do MarketModel que avança com velas reais vindas de uma fila.
+
+    Expõe a mesma interface usada pelo TradingEnv (`price_history`,
+    `current_price`, `step()`); use com `TradingEnv(..., market_factory=...)`.
+    O histórico é podado para no máximo `max_history` preços.
+    """
+    def __init__(self, candle_queue, initial_prices, timeout=None, max_history=10_000):
+        self.candle_queue = candle_queue
+        self.timeout = timeout
+        self.max_history = max_history
+        self.price_history = [float(p) for p in initial_prices][-max_history:]
+        if not self.price_history:
+            raise ValueError("initial_prices não pode ser vazio.")
+        self.current_price = self.price_history[-1]
+        self.step_count = 0
+
+    def step(self):
+        # Bloqueia até a próxima vela fechada (queue.Empty se passar do timeout)
+        candle = self.candle_queue.get(timeout=self.timeout)
+        self.current_price = float(candle[4])
+        self.price_history.append(self.current_price)
+        # Poda amortizada: só corta quando passa do dobro do limite
+        if len(self.price_history) > 2 * self.max_history:
+            del self.price_history[:-self.max_history]
+        self.step_count += 1
+
+
+# --- Bloco de Execução ---
+if __name__ == '__main__':
+    TAIL_DIR = os.path.join('data', 'ETH_USDT_1m_tail')
+    BASE_FILE = os.path.join('data', 'ETH_USDT_1m.parquet')
+
+    print("Iniciando ingestão contínua de velas de 1m (Ctrl+C para parar)...")
+    ingestor = CandleIngestor(CcxtCandleFeed('ETH/USDT', '1m'), TAIL_DIR, base_file=BASE_FILE).start()
+    try:
+        while True:
+            candle = ingestor.candles.get()
+            print(f"Nova vela: {pd.to_datetime(candle[0], unit='ms')} fechamento ${candle[4]:.2f} "
+                  f"(gravadas: {ingestor.written}, descartadas da fila: {ingestor.dropped})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ingestor.stop()
+        print("Ingestão finalizada.")
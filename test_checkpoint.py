@@ -0,0 +1,59 @@
+# test_checkpoint.py
+
+import numpy as np
+import pytest
+
+from checkpoint import load_checkpoint, resume_simulation, run_simulation, save_checkpoint
+from mfa_advanced import MarketModel
+
+
+def test_resume_is_bit_identical(tmp_path, synthetic_prices):
+    """Interromper e retomar de um checkpoint deve produzir exatamente o mesmo caminho."""
+    prices = synthetic_prices()
+    checkpoint_path = str(tmp_path / "model.pkl")
+
+    reference = MarketModel(40, 40, 15, 5, prices, seed=7)
+    for _ in range(300):
+        reference.step()
+
+    model = MarketModel(40, 40, 15, 5, prices, seed=7)
+    run_simulation(model, 150, checkpoint_path, checkpoint_every=50, verbose=False)
+    resumed = resume_simulation(checkpoint_path, prices, 300, checkpoint_every=50, verbose=False)
+
+    assert resumed.steps == 300
+    assert np.array_equal(resumed.price_history, reference.price_history)
+    assert resumed.impact_factor == reference.impact_factor
+
+
+def test_checkpoint_rejects_different_real_prices(tmp_path, synthetic_prices):
+    prices = synthetic_prices()
+    checkpoint_path = str(tmp_path / "model.pkl")
+    save_checkpoint(MarketModel(4, 4, 2, 1, prices, seed=1), checkpoint_path)
+
+    with pytest.raises(ValueError):
+        load_checkpoint(checkpoint_path, synthetic_prices(seed=1))
+
+
+def test_resume_preserves_sampled_agent_params(tmp_path, synthetic_prices):
+    """Parâmetros sorteados (struct-of-arrays) sobrevivem ao checkpoint e o caminho continua idêntico."""
+    prices = synthetic_prices()
+    checkpoint_path = str(tmp_path / "model.pkl")
+    agent_params = {
+        'ChartistAgent': {'lookback_period': lambda rng, n: rng.integers(2, 40, n),
+                          'conviction': lambda rng, n: rng.uniform(0.5, 1.0, n)},
+        'FundamentalistAgent': {'fundamental_period': lambda rng, n: rng.choice([50, 100, 200], n)},
+        'MarketMakerAgent': {'strength': lambda rng, n: rng.uniform(0.1, 0.5, n)},
+    }
+
+    reference = MarketModel(60, 40, 10, 3, prices, seed=5, agent_params=agent_params)
+    for _ in range(200):
+        reference.step()
+
+    model = MarketModel(60, 40, 10, 3, prices, seed=5, agent_params=agent_params)
+    run_simulation(model, 100, checkpoint_path, checkpoint_every=50, verbose=False)
+    resumed = resume_simulation(checkpoint_path, prices, 200, checkpoint_every=50, verbose=False)
+
+    for cls_name, params in reference.agent_params.items():
+        for name, values in params.items():
+            np.testing.assert_array_equal(resumed.agent_params[cls_name][name], values)
+    assert np.array_equal(resumed.price_history, reference.price_history)
@@ -0,0 +1,59 @@
+# test_evaluate.py
+
+import numpy as np
+
+from evaluate import INITIAL_BALANCE, evaluate_policy_batched
+from trading_env import TradingEnv
+
+EPISODE_STEPS = 10
+
+
+class TrendPolicy:
+    """Política de teste: compra em tendência de alta, vende em baixa, e registra o tamanho de cada lote."""
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, observations, deterministic=True):
+        assert observations.ndim == 2
+        self.batch_sizes.append(len(observations))
+        return np.where(observations[:, -1] > observations[:, 0], 1, 2), None
+
+
+def test_one_batched_predict_per_tick_with_refill(synthetic_prices):
+    prices = synthetic_prices()
+    policy = TrendPolicy()
+    metrics = evaluate_policy_batched(policy, prices, n_episodes=5, n_envs=3, seed=1,
+                                      env_kwargs={"simulation_steps": EPISODE_STEPS})
+
+    # 3 ambientes rodam os episódios 0-2; dois deles são reiniciados com os episódios 3 e 4
+    assert policy.batch_sizes == [3] * EPISODE_STEPS + [2] * EPISODE_STEPS
+    assert list(metrics["episode"]) == [0, 1, 2, 3, 4]
+    assert (metrics["steps"] == EPISODE_STEPS).all()
+    assert metrics["seed"].is_unique
+
+    # Reproduz cada episódio isoladamente a partir da sua semente e confere as métricas
+    for row in metrics.itertuples():
+        env = TradingEnv(prices, simulation_steps=EPISODE_STEPS)
+        observation, info = env.reset(seed=row.seed)
+        peak, max_drawdown = info["net_worth"], 0.0
+        terminated = False
+        while not terminated:
+            action = int(TrendPolicy().predict(observation[None, :])[0][0])
+            observation, reward, terminated, truncated, info = env.step(action)
+            peak = max(peak, info["net_worth"])
+            max_drawdown = max(max_drawdown, (peak - info["net_worth"]) / peak)
+
+        assert row.final_net_worth == info["net_worth"]
+        assert row.profit == info["net_worth"] - INITIAL_BALANCE
+        assert row.max_drawdown == max_drawdown
+        assert row.total_reward == info["total_reward"]
+
+
+def test_worker_split_gives_identical_metrics(synthetic_prices):
+    prices = synthetic_prices()
+    kwargs = dict(n_episodes=5, n_envs=2, seed=4, env_kwargs={"simulation_steps": EPISODE_STEPS})
+
+    single = evaluate_policy_batched(TrendPolicy, prices, n_workers=1, **kwargs)
+    pooled = evaluate_policy_batched(TrendPolicy, prices, n_workers=2, **kwargs)
+
+    assert single.equals(pooled)
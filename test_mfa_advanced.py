@@ -0,0 +1,112 @@
+# test_mfa_advanced.py
+
+import numpy as np
+import pytest
+
+from mfa_advanced import ChartistAgent, FundamentalistAgent, MarketModel
+
+
+def test_float32_path_statistics_match_float64(synthetic_prices):
+    """O modo float32 deve manter o dtype em todo o estado e gerar caminhos estatisticamente iguais ao float64."""
+    prices = synthetic_prices()
+    n_steps = 1000
+
+    for seed in range(3):
+        model64 = MarketModel(40, 40, 15, 5, prices, seed=seed)
+        model32 = MarketModel(40, 40, 15, 5, prices.astype(np.float32), seed=seed, dtype=np.float32)
+        for _ in range(n_steps):
+            model64.step()
+            model32.step()
+
+        assert model32.real_prices.dtype == np.float32
+        assert model32.price_history.dtype == np.float32
+        assert np.asarray(model32.base_impact).dtype == np.float64
+        assert np.asarray(model32.impact_factor).dtype == np.float64
+        np.testing.assert_allclose(model32.base_impact, model64.base_impact, rtol=1e-4)
+        assert len(model32.price_history) == len(model64.price_history)
+
+        path64 = model64.price_history.astype(np.float64)
+        path32 = model32.price_history.astype(np.float64)
+        returns64 = np.diff(np.log(path64))
+        returns32 = np.diff(np.log(path32))
+
+        assert np.all(np.isfinite(path32)) and np.all(path32 > 0)
+        np.testing.assert_allclose(path32, path64, rtol=1e-5)
+        np.testing.assert_allclose(returns32.std(), returns64.std(), rtol=1e-3)
+        np.testing.assert_allclose(returns32.mean(), returns64.mean(), atol=1e-7)
+
+
+def test_heterogeneous_agent_params_are_grouped_per_distinct_value(synthetic_prices):
+    """Parâmetros sorteados ficam em arrays e os sinais agrupados batem com o cálculo individual de cada agente."""
+    prices = synthetic_prices()
+    agent_params = {
+        'ChartistAgent': {'lookback_period': lambda rng, n: rng.integers(2, 30, n),
+                          'conviction': lambda rng, n: rng.uniform(0.5, 1.0, n)},
+        'FundamentalistAgent': {'fundamental_period': [50, 100, 200] * 100},
+        'MarketMakerAgent': {'strength': 0.2},
+    }
+    model = MarketModel(500, 300, 15, 5, prices, seed=11, agent_params=agent_params)
+
+    chartist_params = model.agent_params['ChartistAgent']
+    assert chartist_params['lookback_period'].shape == (500,)
+    assert chartist_params['lookback_period'].min() >= 2 and chartist_params['lookback_period'].max() < 30
+    assert ((chartist_params['conviction'] >= 0.5) & (chartist_params['conviction'] < 1.0)).all()
+    assert list(model.agent_params['FundamentalistAgent']['fundamental_period'][:4]) == [50, 100, 200, 50]
+    assert (model.agent_params['MarketMakerAgent']['strength'] == 0.2).all()
+
+    chartists = list(model.agents_by_type[ChartistAgent])
+    fundamentalists = list(model.agents_by_type[FundamentalistAgent])
+    assert chartists[7].lookback_period == chartist_params['lookback_period'][7]
+
+    for _ in range(50):
+        # Os sinais de um passo são calculados a partir do estado anterior a ele
+        history = model.price_history.copy()
+        index = model.step_count
+        current_price = model.current_price
+        model.step()
+
+        for agent in chartists:
+            recent = history[-agent.lookback_period:]
+            expected = 1 if recent[-1] > recent[0] else -1
+            assert model.chartist_signals[agent.param_index] == expected
+        for agent in fundamentalists:
+            fundamental = model.real_prices.iloc[index - agent.fundamental_period:index].mean()
+            expected = 1 if current_price < fundamental else -1
+            assert model.fundamentalist_signals[agent.param_index] == expected
+
+
+def test_setting_a_grouping_param_changes_behavior(synthetic_prices):
+    """Alterar lookback/período depois da construção deve valer já no próximo passo."""
+    prices = synthetic_prices()
+    model = MarketModel(3, 2, 0, 0, prices, seed=0)
+    chartist = list(model.agents_by_type[ChartistAgent])[1]
+    fundamentalist = list(model.agents_by_type[FundamentalistAgent])[0]
+
+    chartist.lookback_period = len(prices) + 1  # Maior que qualquer histórico possível
+    fundamentalist.fundamental_period = len(prices) + 1
+    model.step()
+
+    assert model.agent_params['ChartistAgent']['lookback_period'][1] == len(prices) + 1
+    assert model.chartist_signals[1] == 0 and chartist.demand == 0
+    assert model.chartist_signals[0] != 0
+    assert model.fundamentalist_signals[0] == 0 and fundamentalist.demand == 0
+    assert model.fundamentalist_signals[1] != 0
+
+
+def test_agents_require_param_index(synthetic_prices):
+    model = MarketModel(1, 1, 1, 1, synthetic_prices(), seed=0)
+    with pytest.raises(TypeError):
+        ChartistAgent(model)
+
+
+def test_agent_params_resolve_for_subclasses(synthetic_prices):
+    """Uma subclasse de agente lê e escreve os parâmetros nos arrays da classe que os declara."""
+    class TrendFollower(ChartistAgent):
+        pass
+
+    model = MarketModel(2, 1, 1, 1, synthetic_prices(), seed=0)
+    agent = TrendFollower(model, 1)
+    assert agent.lookback_period == 10 and agent.conviction == 0.75
+
+    agent.lookback_period = 25
+    assert model.agent_params['ChartistAgent']['lookback_period'][1] == 25
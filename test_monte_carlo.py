@@ -0,0 +1,39 @@
+# test_monte_carlo.py
+
+import numpy as np
+import pytest
+
+from mfa_advanced import MarketModel
+from monte_carlo import run_ensemble
+
+SMALL_MODEL = {"n_chartists": 8, "n_fundamentalists": 8, "n_noise": 3, "n_makers": 1}
+
+
+def test_ensemble_is_identical_in_process_and_in_pool(tmp_path, synthetic_prices):
+    prices = synthetic_prices(n=1000)
+    kwargs = dict(n_paths=6, n_steps=30, seed=3, start_offsets=[0, 50, 100, 150, 200, 250],
+                  model_kwargs=SMALL_MODEL, verbose=False)
+
+    serial = run_ensemble(prices, n_workers=1, chunk_size=4, store_path=str(tmp_path / "paths.f32"), **kwargs)
+    pooled = run_ensemble(prices, n_workers=2, chunk_size=2, **kwargs)
+
+    np.testing.assert_array_equal(serial.quantiles, pooled.quantiles)
+    np.testing.assert_array_equal(serial.mean, pooled.mean)
+    assert serial.quantiles.shape == (5, 30)
+
+    paths = serial.load_paths()
+    assert paths.shape == (6, 30) and paths.dtype == np.float32
+    np.testing.assert_allclose(np.quantile(np.asarray(paths, dtype=np.float64), 0.5, axis=0),
+                               serial.quantiles[2], rtol=1e-6)
+    with pytest.raises(ValueError):
+        pooled.load_paths()  # Sem store_path os caminhos não ficam salvos
+
+
+def test_start_offsets_validation(synthetic_prices):
+    prices = synthetic_prices(n=1000)
+    with pytest.raises(ValueError):
+        run_ensemble(prices, 3, n_steps=5, start_offsets=[0, 10], n_workers=1, verbose=False)
+    with pytest.raises(ValueError):
+        MarketModel(1, 1, 1, 1, prices, start_offset=len(prices) - 199)
+    with pytest.raises(ValueError):
+        MarketModel(1, 1, 1, 1, prices, start_offset=-1)
@@ -0,0 +1,67 @@
+# test_perf_stats.py
+
+import json
+
+from perf_stats import PerfStats, PhaseHistogram
+from trading_env import TradingEnv
+
+
+def test_histogram_quantiles_stay_within_observed_range():
+    hist = PhaseHistogram()
+    for duration_ns in [1_000] * 90 + [1_000_000] * 10:
+        hist.record(duration_ns)
+
+    summary = hist.summary()
+    assert summary["count"] == 100
+    assert summary["min_us"] == 1.0 and summary["max_us"] == 1000.0
+    assert 1.0 <= summary["p50_us"] <= 1.024  # Bucket [512, 1024) ns, limitado ao mínimo observado
+    assert 524.288 <= summary["p99_us"] <= 1000.0
+    assert hist.quantile_ns(0.0) >= hist.min_ns
+    assert PhaseHistogram().quantile_ns(0.5) == 0
+
+
+def test_counters_and_chrome_trace_dump(tmp_path):
+    perf = PerfStats(trace=True, max_trace_events=3)
+    for _ in range(5):
+        perf.lap("fase", perf.clock())
+    perf.incr("passos")
+    perf.incr("passos", 4)
+
+    summary = perf.summary()
+    assert summary["counters"] == {"passos": 5}
+    assert summary["phases"]["fase"]["count"] == 5
+
+    trace_path = tmp_path / "trace.json"
+    perf.dump_chrome_trace(str(trace_path))
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert len(events) == 3  # Limitado por max_trace_events
+    assert all(event["ph"] == "X" and event["name"] == "fase" and event["dur"] >= 0 for event in events)
+
+    perf.reset()
+    assert perf.summary() == {"counters": {}, "phases": {}}
+
+
+def test_trading_env_profiling_enabled_and_disabled(synthetic_prices):
+    prices = synthetic_prices()
+
+    env = TradingEnv(prices, profile=True)
+    env.reset(seed=0)
+    env.simulation_steps = 5
+    for _ in range(5):
+        observation, reward, terminated, truncated, info = env.step(0)
+
+    stats = env.get_perf_stats()
+    assert info["perf_stats"] == stats
+    assert stats["counters"]["env.steps"] == 5
+    assert stats["counters"]["env.resets"] == 1
+    assert stats["counters"]["model.steps"] == 5
+    assert stats["counters"]["model.agent_calls"] == 5 * (100 + 5)
+    assert {"env.reset", "env.market_step", "env.observation", "model.shuffle_do"} <= set(stats["phases"])
+
+    disabled = TradingEnv(prices)
+    disabled.reset(seed=0)
+    disabled.simulation_steps = 1
+    *_, info = disabled.step(0)
+    assert disabled.get_perf_stats() is None
+    assert disabled.market_model.perf is None
+    assert "perf_stats" not in info
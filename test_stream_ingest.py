@@ -0,0 +1,125 @@
+# test_stream_ingest.py
+
+import time
+
+import pandas as pd
+import pytest
+
+from stream_ingest import CandleIngestor, FakeCandleFeed, QueueReplayMarket, _candles_to_frame, load_dataset
+from trading_env import TradingEnv
+
+
+def test_ingestor_appends_and_feeds_replay_env(tmp_path):
+    """Velas da fonte falsa devem chegar ao disco (sem duplicatas) e ao TradingEnv em modo replay."""
+    tail_dir = str(tmp_path / "tail")
+    feed = FakeCandleFeed(start_price=2000.0, interval_s=0.01, start_ms=0, seed=3).start()
+    ingestor = CandleIngestor(feed, tail_dir, since_ms=0, batch_size=5, poll_interval_s=0.005,
+                              queue_size=100).start()
+
+    env = TradingEnv(
+        real_prices_data=None, window_size=10,
+        market_factory=lambda: QueueReplayMarket(ingestor.candles, [2000.0] * 10, timeout=5),
+    )
+    observation, info = env.reset()
+    prices = []
+    for _ in range(12):
+        observation, reward, terminated, truncated, info = env.step(1)
+        prices.append(env.market_model.current_price)
+
+    ingestor.stop()
+    feed.stop()
+
+    df = load_dataset(tail_dir)
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    assert len(df) == ingestor.written >= 12
+    assert list(df['close'].iloc[:12]) == prices
+    assert abs(observation[-1] - prices[-1]) < 1e-2  # observação em float32
+
+
+def test_ingestor_drops_oldest_when_queue_full(tmp_path):
+    class StaticFeed:
+        def fetch_closed(self, since_ms):
+            return [[i * 60_000, 1.0, 1.0, 1.0, float(i), 1.0] for i in range(10) if i * 60_000 >= since_ms]
+
+    ingestor = CandleIngestor(StaticFeed(), str(tmp_path), since_ms=0, queue_size=3)
+    ingestor.poll_once()
+    ingestor.poll_once()  # Nada novo na segunda chamada
+
+    assert ingestor.dropped == 7
+    assert [ingestor.candles.get_nowait()[4] for _ in range(3)] == [7.0, 8.0, 9.0]
+    ingestor.flush()
+    assert len(load_dataset(str(tmp_path))) == 10
+
+
+def test_failed_write_keeps_candles_for_next_flush(tmp_path, monkeypatch):
+    class StaticFeed:
+        def __init__(self):
+            self.candles = []
+
+        def fetch_closed(self, since_ms):
+            return [candle for candle in self.candles if candle[0] >= since_ms]
+
+    feed = StaticFeed()
+    feed.candles = [[i * 60_000, 1.0, 1.0, 1.0, float(i), 1.0] for i in range(3)]
+    ingestor = CandleIngestor(feed, str(tmp_path), since_ms=0, batch_size=3)
+
+    original_to_parquet = pd.DataFrame.to_parquet
+
+    def failing_to_parquet(self, *args, **kwargs):
+        raise OSError("disco cheio")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", failing_to_parquet)
+    with pytest.raises(OSError):
+        ingestor.poll_once()
+    assert ingestor.written == 0 and ingestor.next_ms == 3 * 60_000
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", original_to_parquet)
+    feed.candles += [[i * 60_000, 1.0, 1.0, 1.0, float(i), 1.0] for i in range(3, 5)]
+    ingestor.poll_once()
+    ingestor.flush()
+
+    df = load_dataset(str(tmp_path))
+    assert ingestor.written == 5
+    assert list(df['close']) == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_ingestor_start_point(tmp_path):
+    """Retoma depois da última vela em disco (partes ou arquivo base); sem dados, começa no minuto atual."""
+    class NoFeed:
+        def fetch_closed(self, since_ms):
+            return []
+
+    base_file = str(tmp_path / "base.parquet")
+    _candles_to_frame([[i * 60_000, 1.0, 1.0, 1.0, 1.0, 1.0] for i in range(10)]).to_parquet(base_file)
+
+    empty_dir = str(tmp_path / "empty")
+    assert CandleIngestor(NoFeed(), empty_dir, base_file=base_file).next_ms == 10 * 60_000
+
+    tail_dir = str(tmp_path / "tail")
+    ingestor = CandleIngestor(NoFeed(), tail_dir, since_ms=0)
+    ingestor._batch = [[i * 60_000, 1.0, 1.0, 1.0, 1.0, 1.0] for i in range(20, 25)]
+    ingestor.flush()
+    assert CandleIngestor(NoFeed(), tail_dir, base_file=base_file).next_ms == 25 * 60_000
+
+    before_ms = int(time.time() * 1000)
+    fresh = CandleIngestor(NoFeed(), str(tmp_path / "fresh"))
+    assert fresh.next_ms % 60_000 == 0
+    assert before_ms - 60_000 < fresh.next_ms <= int(time.time() * 1000)
+
+
+def test_ingestor_uses_feed_interval(tmp_path):
+    """Com velas de 5m, o próximo timestamp buscado avança 5 minutos, não 1."""
+    class FiveMinuteFeed:
+        interval_ms = 300_000
+
+        def fetch_closed(self, since_ms):
+            return [[i * 300_000, 1.0, 1.0, 1.0, 1.0, 1.0] for i in range(4) if i * 300_000 >= since_ms]
+
+    ingestor = CandleIngestor(FiveMinuteFeed(), str(tmp_path), since_ms=0)
+    assert ingestor.poll_once() == 4
+    assert ingestor.next_ms == 4 * 300_000
+    ingestor.flush()
+
+    resumed = CandleIngestor(FiveMinuteFeed(), str(tmp_path))
+    assert resumed.next_ms == 4 * 300_000
+    assert resumed.poll_once() == 0
@@ -0,0 +1,93 @@
+# test_trajectory_recorder.py
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from trading_env import TradingEnv
+from trajectory_recorder import RecordedDataset, TrajectoryRecorder
+
+
+def run_episodes(env, n_episodes, actions=(1, 0, 2)):
+    """Roda episódios curtos e devolve, por episódio, as colunas vistas pelo chamador."""
+    episodes = []
+    for episode in range(n_episodes):
+        env.reset(seed=episode)
+        seen = {"price": [], "action": [], "reward": [], "net_worth": []}
+        terminated = False
+        step = 0
+        while not terminated:
+            action = actions[step % len(actions)]
+            _, reward, terminated, _, info = env.step(action)
+            seen["price"].append(env.unwrapped.market_model.current_price)
+            seen["action"].append(action)
+            seen["reward"].append(reward)
+            seen["net_worth"].append(info["net_worth"])
+            step += 1
+        episodes.append(seen)
+    return episodes
+
+
+def make_recorder(prices, output_dir, episode_steps=25, **kwargs):
+    base_env = TradingEnv(prices)
+    base_env.simulation_steps = episode_steps
+    return TrajectoryRecorder(base_env, output_dir, **kwargs)
+
+
+@pytest.mark.parametrize("format", ["arrow", "parquet"])
+def test_round_trip(tmp_path, synthetic_prices, format):
+    output_dir = str(tmp_path / format)
+    env = make_recorder(synthetic_prices(), output_dir, format=format)
+    expected = run_episodes(env, 2)
+    env.close()
+
+    dataset = RecordedDataset(output_dir)
+    assert len(dataset) == 2
+    assert dataset.num_steps == 50
+    for index, seen in enumerate(expected):
+        episode = dataset[index]
+        assert episode["episode"].dtype == np.int32 and episode["action"].dtype == np.int8
+        np.testing.assert_array_equal(episode["step"], np.arange(25))
+        for name, values in seen.items():
+            np.testing.assert_array_equal(episode[name], values)
+
+
+def test_episode_spanning_several_chunks(tmp_path, synthetic_prices):
+    output_dir = str(tmp_path / "chunks")
+    env = make_recorder(synthetic_prices(), output_dir, episode_steps=25, chunk_size=10)
+    expected = run_episodes(env, 1)
+    env.close()
+
+    assert sorted(os.listdir(output_dir)) == ["part-00000.arrow", "part-00001.arrow", "part-00002.arrow"]
+    dataset = RecordedDataset(output_dir)
+    assert len(dataset) == 1
+    episode = dataset[0]
+    np.testing.assert_array_equal(episode["step"], np.arange(25))
+    np.testing.assert_array_equal(episode["price"], expected[0]["price"])
+    np.testing.assert_array_equal(dataset[-1]["net_worth"], expected[0]["net_worth"])
+    with pytest.raises(IndexError):
+        dataset[1]
+
+
+def test_writer_error_surfaces_on_close_and_flush(tmp_path, synthetic_prices):
+    output_dir = str(tmp_path / "broken")
+    env = make_recorder(synthetic_prices(), output_dir)
+    run_episodes(env, 1)
+    shutil.rmtree(output_dir)  # A thread de escrita não consegue mais criar os arquivos
+
+    with pytest.raises(RuntimeError):
+        env.close()
+    with pytest.raises(RuntimeError):
+        env.flush()
+
+
+def test_refuses_directory_with_previous_recording(tmp_path, synthetic_prices):
+    output_dir = str(tmp_path / "reused")
+    env = make_recorder(synthetic_prices(), output_dir)
+    run_episodes(env, 1)
+    env.close()
+
+    with pytest.raises(FileExistsError):
+        make_recorder(synthetic_prices(), output_dir)
@@ -8,6 +8,7 @@ import os
 
 # Importa o nosso simulador de mercado da iteração anterior
 from mfa_advanced import MarketModel, load_real_data
+from perf_stats import PerfStats
 
 class TradingEnv(gym.Env):
     """
@@ -16,12 +17,20 @@ class TradingEnv(gym.Env):
     """
     metadata = {'render_modes': ['human']}
 
-    def __init__(self, real_prices_data, window_size=60):
+    def __init__(self, real_prices_data, window_size=60, profile=False, profile_trace=False, market_factory=None,
+                 dtype=np.float64, simulation_steps=1000):
         super().__init__()
 
+        # dtype=np.float32 mantém preços reais e histórico do simulador em float32
+        self.dtype = np.dtype(dtype)
+        if real_prices_data is not None and real_prices_data.dtype != self.dtype:
+            real_prices_data = real_prices_data.astype(self.dtype)  # Converte uma vez, não a cada reset
         self.real_prices_data = real_prices_data
+        # Opcional: função que cria o mercado no reset (ex.: stream_ingest.QueueReplayMarket
+        # para replay de velas reais). Por padrão, um novo MarketModel.
+        self.market_factory = market_factory
         self.window_size = window_size
-        self.simulation_steps = 1000 # Duração de cada episódio de treinamento
+        self.simulation_steps = simulation_steps # Duração de cada episódio de treinamento
 
         # --- 1. Definir os Espaços de Ação e Observação ---
         # 3 ações discretas: 0=Manter, 1=Comprar, 2=Vender
@@ -40,6 +49,15 @@ class TradingEnv(gym.Env):
         self.net_worth = self.balance
         self.total_reward = 0
 
+        # Instrumentação por fase (opcional). Compartilhada com o MarketModel.
+        self.perf = PerfStats(trace=profile_trace) if profile else None
+
+    def get_perf_stats(self):
+        """Retorna os tempos por fase e contadores acumulados (None se profile=False)."""
+        if self.perf is None:
+            return None
+        return self.perf.summary()
+
     def _get_obs(self):
         """Retorna a observação atual (a janela de preços)."""
         # Pega os últimos `window_size` preços do histórico do nosso simulador
@@ -58,12 +76,20 @@ class TradingEnv(gym.Env):
     def reset(self, seed=None, options=None):
         """Reinicia o ambiente para um novo episódio."""
         super().reset(seed=seed)
+        perf = self.perf
+        if perf is not None:
+            t = perf.clock()
 
         # Cria uma nova instância do nosso simulador de mercado
-        self.market_model = MarketModel(
-            n_chartists=40, n_fundamentalists=40, n_noise=15, n_makers=5,
-            real_prices_series=self.real_prices_data
-        )
+        if self.market_factory is not None:
+            self.market_model = self.market_factory()
+        else:
+            # A semente do simulador vem do np_random do ambiente: reset(seed=...) torna o episódio reprodutível
+            self.market_model = MarketModel(
+                n_chartists=40, n_fundamentalists=40, n_noise=15, n_makers=5,
+                real_prices_series=self.real_prices_data, perf=perf,
+                seed=int(self.np_random.integers(2**31)), dtype=self.dtype
+            )
 
         # Reseta o estado do portfólio
         self.current_step = 0
@@ -75,6 +101,9 @@ class TradingEnv(gym.Env):
         # Pega a observação e info iniciais
         observation = self._get_obs()
         info = self._get_info()
+        if perf is not None:
+            perf.lap("env.reset", t)
+            perf.incr("env.resets")
 
         return observation, info
 
@@ -103,9 +132,15 @@ class TradingEnv(gym.Env):
                 self.balance += self.shares_held * current_price
                 self.shares_held = 0
 
+        perf = self.perf
+        if perf is not None:
+            t = perf.clock()
+
         # --- Avança o Simulador de Mercado ---
         self.market_model.step()
         self.current_step += 1
+        if perf is not None:
+            perf.lap("env.market_step", t)
 
         # --- Calcula o Estado e a Recompensa ---
         # Atualiza o patrimônio líquido
@@ -116,13 +151,22 @@ class TradingEnv(gym.Env):
         self.total_reward += reward
 
         # --- Prepara o Retorno ---
+        if perf is not None:
+            t = perf.clock()
         observation = self._get_obs()
+        if perf is not None:
+            perf.lap("env.observation", t)
+            perf.incr("env.steps")
         info = self._get_info()
         
         # Define se o episódio terminou
         terminated = self.net_worth <= 0 or self.current_step >= self.simulation_steps
         truncated = False # Não estamos usando truncamento por tempo aqui
 
+        # Com profiling ligado, o resumo acompanha o info do último passo do episódio
+        if perf is not None and (terminated or truncated):
+            info["perf_stats"] = perf.summary()
+
         return observation, reward, terminated, truncated, info
 
     def render(self, mode='human'):
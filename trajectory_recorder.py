@@ -0,0 +1,190 @@
+# trajectory_recorder.py
+
+import os
+import queue
+import threading
+
+import gymnasium as gym
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+# Colunas gravadas por passo e seus tipos
+TRAJECTORY_COLUMNS = {
+    "episode": np.int32,
+    "step": np.int32,
+    "price": np.float64,
+    "action": np.int8,
+    "reward": np.float64,
+    "net_worth": np.float64,
+    "shares_held": np.float64,
+    "balance": np.float64,
+}
+
+FILE_EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+
+class TrajectoryRecorder(gym.Wrapper):
+    """
+    Wrapper que grava a trajetória completa do TradingEnv em colunas tipadas.
+
+    Cada passo é escrito em blocos NumPy pré-alocados de `chunk_size` linhas.
+    Quando um bloco enche, ele é entregue a uma thread de fundo que o salva
+    como um arquivo Arrow IPC (`format='arrow'`, permite replay via memory map)
+    ou Parquet (`format='parquet'`, mais compacto) em `output_dir`.
+    Cada gravação usa um diretório próprio: um `output_dir` que já contém
+    partes de outra execução é recusado, para não misturar as duas.
+    """
+    def __init__(self, env, output_dir, chunk_size=65536, format="arrow", max_pending_chunks=4):
+        super().__init__(env)
+        if format not in FILE_EXTENSIONS:
+            raise ValueError(f"Formato inválido: {format}. Use 'arrow' ou 'parquet'.")
+
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        self.format = format
+        os.makedirs(output_dir, exist_ok=True)
+        if any(name.startswith("part-") for name in os.listdir(output_dir)):
+            raise FileExistsError(f"'{output_dir}' já contém uma trajetória gravada; use outro diretório.")
+
+        self.episode = -1
+        self.episode_step = 0
+        self._chunk_index = 0
+        self._new_chunk()
+
+        # Fila limitada: se a escrita ficar para trás, o passo bloqueia em vez de crescer a memória
+        self._pending = queue.Queue(maxsize=max_pending_chunks)
+        self._writer_error = None
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _new_chunk(self):
+        self._columns = {name: np.empty(self.chunk_size, dtype=dtype) for name, dtype in TRAJECTORY_COLUMNS.items()}
+        self._rows = 0
+
+    def reset(self, **kwargs):
+        observation, info = self.env.reset(**kwargs)
+        self.episode += 1
+        self.episode_step = 0
+        return observation, info
+
+    def step(self, action):
+        observation, reward, terminated, truncated, info = self.env.step(action)
+
+        row = self._rows
+        columns = self._columns
+        columns["episode"][row] = self.episode
+        columns["step"][row] = self.episode_step
+        columns["price"][row] = self.env.unwrapped.market_model.current_price
+        columns["action"][row] = action
+        columns["reward"][row] = reward
+        columns["net_worth"][row] = info["net_worth"]
+        columns["shares_held"][row] = info["shares_held"]
+        columns["balance"][row] = info["balance"]
+        self._rows += 1
+        self.episode_step += 1
+
+        if self._rows == self.chunk_size:
+            self.flush()
+
+        return observation, reward, terminated, truncated, info
+
+    def flush(self):
+        """Envia o bloco atual (mesmo parcial) para a thread de escrita."""
+        if self._writer_error is not None:
+            raise RuntimeError("Falha ao gravar a trajetória") from self._writer_error
+        if self._rows == 0:
+            return
+        rows = self._rows
+        table = pa.table({name: values[:rows] for name, values in self._columns.items()})
+        path = os.path.join(self.output_dir, f"part-{self._chunk_index:05d}{FILE_EXTENSIONS[self.format]}")
+        self._pending.put((table, path))
+        self._chunk_index += 1
+        # O bloco antigo agora pertence à tabela na fila; começamos um novo
+        self._new_chunk()
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            table, path = item
+            try:
+                # Escreve em arquivo temporário e renomeia, para não deixar arquivos parciais
+                tmp_path = path + ".tmp"
+                if self.format == "arrow":
+                    with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                else:
+                    pq.write_table(table, tmp_path)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                self._writer_error = e
+
+    def close(self):
+        """Grava o bloco restante e espera a thread de escrita terminar."""
+        if self._writer.is_alive():
+            self.flush()
+            self._pending.put(None)
+            self._writer.join()
+        if self._writer_error is not None:
+            raise RuntimeError("Falha ao gravar a trajetória") from self._writer_error
+        super().close()
+
+
+class RecordedDataset:
+    """
+    Leitura de trajetórias gravadas pelo TrajectoryRecorder.
+
+    Arquivos Arrow são abertos via memory map (sem copiar para a memória);
+    arquivos Parquet são lidos normalmente.
+    """
+    def __init__(self, directory):
+        files = sorted(
+            f for f in os.listdir(directory)
+            if f.startswith("part-") and f.endswith(tuple(FILE_EXTENSIONS.values()))
+        )
+        if not files:
+            raise FileNotFoundError(f"Nenhuma trajetória encontrada em '{directory}'.")
+
+        tables = []
+        for name in files:
+            path = os.path.join(directory, name)
+            if name.endswith(".arrow"):
+                tables.append(ipc.open_file(pa.memory_map(path, "r")).read_all())
+            else:
+                tables.append(pq.read_table(path, memory_map=True))
+        self.table = pa.concat_tables(tables)
+
+        # Limites dos episódios (os ids são gravados em ordem crescente)
+        episodes = self.table.column("episode").to_numpy()
+        starts = np.flatnonzero(np.diff(episodes)) + 1
+        self._bounds = np.concatenate(([0], starts, [len(episodes)]))
+        self.episode_ids = episodes[self._bounds[:-1]] if len(episodes) else episodes
+
+    def __len__(self):
+        """Número de episódios gravados."""
+        return len(self._bounds) - 1
+
+    @property
+    def num_steps(self):
+        return self.table.num_rows
+
+    def column(self, name):
+        """Retorna uma coluna inteira como array NumPy."""
+        return self.table.column(name).to_numpy()
+
+    def __getitem__(self, index):
+        """Retorna o episódio `index` como um dicionário de arrays NumPy."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start, end = self._bounds[index], self._bounds[index + 1]
+        episode = self.table.slice(start, end - start)
+        return {name: episode.column(name).to_numpy() for name in episode.column_names}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]